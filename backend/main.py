@@ -1,11 +1,19 @@
+import asyncio
+import hashlib
 import io
 import json
 import os
+import re
+import stat
 import tempfile
+import time
+import warnings
+import zipfile
 from dataclasses import dataclass
-from typing import Literal
+from typing import Any, Callable, Literal, TypeVar
 
 import pandas as pd
+import pyarrow as pa
 import tabula
 import uvicorn
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
@@ -13,6 +21,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response, StreamingResponse
 from pdf2image import convert_from_path
 from pypdf import PdfReader
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import fcntl
+except ImportError:  # Windows ではワーカー間の調停を行わない
+    fcntl = None
 
 app = FastAPI(
     title="Tabula Web API",
@@ -32,6 +46,16 @@ app.add_middleware(
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
+# 同一リクエストの多重実行を抑止する（single-flight）ための設定
+# SINGLE_FLIGHT_DIR を指定した場合のみ、ファイルロックで uvicorn ワーカー間でも結果を共有する
+SINGLE_FLIGHT_DIR = os.getenv("SINGLE_FLIGHT_DIR", "")
+SINGLE_FLIGHT_RESULT_TTL = float(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "10"))  # 秒
+
+T = TypeVar("T")
+
+_inflight: dict[str, asyncio.Future] = {}
+_single_flight_dir_warned = False
+
 
 @dataclass(frozen=True)
 class PageGeometry:
@@ -144,6 +168,203 @@ def _write_temp_pdf(content: bytes) -> str:
         return tmp.name
 
 
+def _single_flight_key(content: bytes, endpoint: str, params: dict) -> str:
+    """(文書ハッシュ, エンドポイント, 正規化済みパラメータ) から重複判定用のキーを作る。"""
+    document_hash = hashlib.sha256(content).hexdigest()
+    normalized = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{document_hash}:{endpoint}:{normalized}".encode("utf-8")).hexdigest()
+
+
+def _dump_json(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _load_json(data: bytes) -> Any:
+    return json.loads(data)
+
+
+def _dump_dataframes(dfs: list[pd.DataFrame]) -> bytes:
+    return _dump_json([
+        {
+            "columns": [str(c) for c in df.columns],
+            "data": df.astype(object).where(df.notna(), None).values.tolist(),
+        }
+        for df in dfs
+    ])
+
+
+def _load_dataframes(data: bytes) -> list[pd.DataFrame]:
+    return [pd.DataFrame(table["data"], columns=table["columns"]) for table in _load_json(data)]
+
+
+def _identity(data: bytes) -> bytes:
+    return data
+
+
+def _warn_single_flight_dir(reason: str) -> None:
+    global _single_flight_dir_warned
+    if _single_flight_dir_warned:
+        return
+    _single_flight_dir_warned = True
+    warnings.warn(
+        f"SINGLE_FLIGHT_DIR={SINGLE_FLIGHT_DIR!r} を使用できないため、"
+        f"ワーカー間の重複リクエスト抑止を無効にします: {reason}",
+        RuntimeWarning,
+        stacklevel=2,
+    )
+
+
+def _prepare_single_flight_dir() -> bool:
+    """共有ディレクトリが自ユーザー所有かつ 0700 の場合のみワーカー間の調停に使う。"""
+    try:
+        os.makedirs(SINGLE_FLIGHT_DIR, mode=0o700, exist_ok=True)
+        st = os.lstat(SINGLE_FLIGHT_DIR)
+    except OSError as e:
+        _warn_single_flight_dir(str(e))
+        return False
+
+    if not stat.S_ISDIR(st.st_mode):
+        _warn_single_flight_dir("ディレクトリではありません")
+        return False
+    if st.st_uid != os.getuid():
+        _warn_single_flight_dir(f"所有者 uid {st.st_uid} が実行ユーザー uid {os.getuid()} と異なります")
+        return False
+    if stat.S_IMODE(st.st_mode) != 0o700:
+        _warn_single_flight_dir(f"パーミッションが {oct(stat.S_IMODE(st.st_mode))} です（0o700 が必要）")
+        return False
+    return True
+
+
+def _result_path(key: str) -> str:
+    return os.path.join(SINGLE_FLIGHT_DIR, f"{key}.result")
+
+
+def _remove_if_expired(path: str) -> None:
+    try:
+        if time.time() - os.path.getmtime(path) > SINGLE_FLIGHT_RESULT_TTL:
+            os.unlink(path)
+    except OSError:
+        pass
+
+
+def _sweep_expired_results() -> None:
+    """保持期間を過ぎた結果ファイルと書きかけの一時ファイルを削除する。"""
+    try:
+        names = os.listdir(SINGLE_FLIGHT_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith((".result", ".tmp")):
+            _remove_if_expired(os.path.join(SINGLE_FLIGHT_DIR, name))
+
+
+def _load_recent_result(result_path: str, load: Callable[[bytes], T]) -> tuple[bool, T | None]:
+    """他ワーカーが直前に書き出した結果があれば読み込む。"""
+    try:
+        fd = os.open(result_path, os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return False, None
+    try:
+        with os.fdopen(fd, "rb") as f:
+            if time.time() - os.fstat(f.fileno()).st_mtime > SINGLE_FLIGHT_RESULT_TTL:
+                return False, None
+            return True, load(f.read())
+    except (OSError, ValueError, KeyError, TypeError):
+        return False, None
+
+
+def _store_result(result_path: str, data: bytes) -> None:
+    _sweep_expired_results()
+    fd, tmp_path = tempfile.mkstemp(dir=SINGLE_FLIGHT_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, result_path)
+    except OSError:
+        # 書き出せなかった結果は共有せず、各ワーカーで再計算させる
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _acquire_file_lock(lock_path: str) -> int:
+    while True:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # 待機中に先行ワーカーがロックファイルを削除していれば、作り直して取り直す
+        try:
+            if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+def _run_with_file_lock(
+    key: str,
+    func: Callable[[], T],
+    dump: Callable[[T], bytes],
+    load: Callable[[bytes], T],
+) -> T:
+    """
+    ファイルロックで uvicorn ワーカー間の同一処理を直列化する。
+    ロック待ちの間に先行ワーカーが結果を書き出していれば、それを再利用する。
+    結果は pickle ではなく dump/load で相互変換できるバイト列として保存する。
+    """
+    if fcntl is None or not SINGLE_FLIGHT_DIR or not _prepare_single_flight_dir():
+        return func()
+
+    lock_path = os.path.join(SINGLE_FLIGHT_DIR, f"{key}.lock")
+    result_path = _result_path(key)
+
+    fd = _acquire_file_lock(lock_path)
+    try:
+        found, result = _load_recent_result(result_path, load)
+        if found:
+            return result
+        result = func()
+        _store_result(result_path, dump(result))
+        return result
+    finally:
+        # ロックを保持したまま削除し、待機中のワーカーには作り直しを促す
+        try:
+            os.unlink(lock_path)
+        except OSError:
+            pass
+        os.close(fd)
+
+
+async def _single_flight(
+    key: str,
+    func: Callable[[], T],
+    dump: Callable[[T], bytes],
+    load: Callable[[bytes], T],
+) -> T:
+    """
+    実行中の同一リクエストがあれば、その完了を待って結果を共有する。
+    処理本体はスレッドプールで実行し、呼び出し元がキャンセルされても継続する。
+    """
+    task = _inflight.get(key)
+    if task is None:
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(run_in_threadpool(_run_with_file_lock, key, func, dump, load))
+        _inflight[key] = task
+
+        def on_done(_: asyncio.Future) -> None:
+            _inflight.pop(key, None)
+            if SINGLE_FLIGHT_DIR:
+                # 保持期間を過ぎたら、ワーカー間共有用の結果ファイルを削除する
+                loop.call_later(SINGLE_FLIGHT_RESULT_TTL + 1, _remove_if_expired, _result_path(key))
+
+        task.add_done_callback(on_done)
+    return await asyncio.shield(task)
+
+
+def _normalize_pages(pages: str) -> str:
+    """空白を除去し、大文字小文字を問わず "all" を tabula が受け付ける "all" に揃える。"""
+    pages = re.sub(r"\s+", "", pages)
+    return "all" if pages.lower() == "all" else pages
+
+
 def _parse_regions(regions: str) -> list[dict]:
     try:
         region_list = json.loads(regions) if regions else []
@@ -244,31 +465,164 @@ def _extract_dataframes(
     return _filter_tables(dfs)
 
 
-def _extract_dataframes_from_content(
+async def _extract_dataframes_from_content(
     content: bytes,
     mode: Literal["lattice", "stream"],
     pages: str,
     area: str,
     regions: str,
 ) -> list[pd.DataFrame]:
+    # キーと実際の抽出で同じ値を使い、同一キーのリクエストが必ず同じ処理になるようにする
+    pages = _normalize_pages(pages)
     legacy_area = _parse_area(area)
     region_list = _parse_regions(regions)
-    tmp_path = _write_temp_pdf(content)
 
-    try:
-        return _extract_dataframes(tmp_path, mode, pages, legacy_area, region_list)
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=f"PDF の解析に失敗しました: {str(e)}")
-    finally:
-        os.unlink(tmp_path)
+    def extract() -> list[pd.DataFrame]:
+        tmp_path = _write_temp_pdf(content)
+        try:
+            return _extract_dataframes(tmp_path, mode, pages, legacy_area, region_list)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"PDF の解析に失敗しました: {str(e)}")
+        finally:
+            os.unlink(tmp_path)
+
+    key = _single_flight_key(
+        content,
+        "extract",
+        {
+            "mode": mode,
+            "pages": pages,
+            "area": legacy_area,
+            "regions": region_list,
+        },
+    )
+    return await _single_flight(key, extract, _dump_dataframes, _load_dataframes)
 
 
 def _clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return _strip_cell_newlines(df.fillna(""))
 
 
+# 統計表で欠損・秘匿・該当なしを表す記号
+_MISSING_MARKERS = ["", "-", "―", "—", "…", "...", "x", "X", "*", "***"]
+# カンマを含む場合は 3 桁区切りとして正しい位置にあるものだけを受け付ける
+_NUMBER_PATTERN = r"[+-]?(?:(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d*)?|\.\d+)"
+# int64 に確実に収まる桁数（超える列は ID 等の可能性があるため文字列のまま残す）
+_MAX_INTEGER_DIGITS = 18
+# 「2024年1月15日」「令和5年1月」「R5.1.15」「2024/1/15」「2024-01」など（年月のみは 1 日とする）
+_ERA = r"(令和|平成|昭和|R|H|S)?"
+_KANJI_DATE_PATTERN = rf"^{_ERA}(\d{{1,4}}|元)年(\d{{1,2}})月(?:(\d{{1,2}})日)?$"
+_SEPARATED_DATE_PATTERN = rf"^{_ERA}(\d{{1,4}}|元)([/.-])(\d{{1,2}})(?:\3(\d{{1,2}}))?$"
+_ERA_OFFSETS = {"令和": 2018, "平成": 1988, "昭和": 1925, "R": 2018, "H": 1988, "S": 1925}
+
+
+def _normalize_cells(series: pd.Series) -> pd.Series:
+    """全角英数字を半角に揃え、欠損記号を NA に置き換える。"""
+    values = (
+        series.astype("string")
+        .str.normalize("NFKC")
+        .str.replace("\u2212", "-", regex=False)  # NFKC で変換されないマイナス記号
+        .str.strip()
+    )
+    return values.mask(values.isin(_MISSING_MARKERS))
+
+
+def _infer_numeric_column(values: pd.Series) -> pd.Series | None:
+    """
+    「1,234」「△12」「12.5%」形式を数値に変換する。
+    △/▲ は負数、% は 100 で割った比率として扱う。
+    統計表の括弧（内数・参考値）は負数とみなさず、括弧を含む列は文字列のまま残す。
+    全セルが数値として解釈できない場合、% の有無が混在する場合、
+    「01」のようなゼロ埋めコードを含む場合は None を返す。
+    """
+    present = values.dropna()
+    if present.empty:
+        return None
+
+    is_negative = present.str.match(r"^[△▲]")
+    is_percent = present.str.endswith("%")
+    if is_percent.any() and not is_percent.all():
+        return None
+
+    digits = present.str.replace(r"^[△▲]|%$", "", regex=True).str.strip()
+    if not digits.str.fullmatch(_NUMBER_PATTERN).all():
+        return None
+    # 「△-12」のように符号が二重になっているセルは解釈しない
+    if (is_negative & digits.str.match(r"[+-]")).any():
+        return None
+
+    plain = digits.str.replace(",", "", regex=False)
+    unsigned = plain.str.lstrip("+-")
+    if unsigned.str.match(r"0\d").any():
+        return None
+
+    is_negative = is_negative.to_numpy(dtype=bool)
+    if not is_percent.any() and not plain.str.contains(".", regex=False).any():
+        # 整数列は float を経由せずに Int64 へ変換し、精度落ちを防ぐ
+        if (unsigned.str.len() > _MAX_INTEGER_DIGITS).any():
+            return None
+        integers = pd.to_numeric(plain.astype(object)).astype("Int64")
+        integers = integers.mask(is_negative, -integers)
+        return integers.reindex(values.index)
+
+    numbers = pd.to_numeric(plain.astype(object)).astype("Float64")
+    numbers = numbers.mask(is_negative, -numbers)
+    if is_percent.any():
+        numbers = numbers / 100
+    return numbers.reindex(values.index)
+
+
+def _infer_date_column(values: pd.Series) -> pd.Series | None:
+    """
+    西暦・和暦（略記を含む）の年月日・年月を日付に変換する。
+    全セルが日付でない場合は None を返す。
+    """
+    present = values.dropna()
+    if present.empty:
+        return None
+
+    kanji = present.str.extract(_KANJI_DATE_PATTERN)
+    separated = present.str.extract(_SEPARATED_DATE_PATTERN).drop(columns=2)
+    separated.columns = kanji.columns
+    parts = kanji.combine_first(separated)
+    if parts[[1, 2]].isna().any().any():
+        return None
+    # 元号なしの場合は 4 桁の西暦のみ受け付ける
+    if not (parts[0].notna() | (parts[1].str.len() == 4)).all():
+        return None
+
+    era_offset = parts[0].map(_ERA_OFFSETS).fillna(0)
+    year = pd.to_numeric(parts[1].replace("元", "1")) + era_offset
+    dates = pd.to_datetime(
+        pd.DataFrame({
+            "year": year.astype(int),
+            "month": pd.to_numeric(parts[2]),
+            "day": pd.to_numeric(parts[3].fillna("1")),
+        }),
+        errors="coerce",
+    )
+    if dates.isna().any():
+        return None
+    return dates.reindex(values.index)
+
+
+def _infer_column_types(df: pd.DataFrame) -> pd.DataFrame:
+    """文字列の列を、列単位のベクトル演算で数値・日付型に変換する。"""
+    typed = {}
+    for i, column in enumerate(df.columns):
+        values = _normalize_cells(df.iloc[:, i])
+        converted = _infer_numeric_column(values)
+        if converted is None:
+            converted = _infer_date_column(values)
+        typed[i] = converted if converted is not None else df.iloc[:, i]
+
+    result = pd.DataFrame(typed, index=df.index)
+    result.columns = df.columns
+    return result
+
+
 def _dataframe_to_table(df: pd.DataFrame, index: int) -> dict:
     df = _clean_dataframe(df)
     return {
@@ -284,6 +638,59 @@ def _dataframes_to_tables(dfs: list[pd.DataFrame]) -> list[dict]:
     return [_dataframe_to_table(df, i) for i, df in enumerate(dfs)]
 
 
+def _typed_dataframe_to_table(df: pd.DataFrame, index: int) -> dict:
+    """型推論済みの DataFrame を NA・日付を含めて JSON 化できる形に変換する。"""
+    return {
+        "index": index,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "headers": df.columns.tolist(),
+        "data": json.loads(df.to_json(orient="values", date_format="iso", force_ascii=False)),
+    }
+
+
+def _with_unique_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Parquet / Arrow は列名の重複を許さないため、重複・空の列名に連番を付ける。"""
+    names: list[str] = []
+    seen: set[str] = set()
+    for i, column in enumerate(df.columns):
+        base = str(column) or f"column_{i + 1}"
+        name = base
+        suffix = 1
+        while name in seen:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        seen.add(name)
+        names.append(name)
+
+    df = df.copy(deep=False)
+    df.columns = names
+    return df
+
+
+def _dataframe_to_parquet(df: pd.DataFrame) -> bytes:
+    df = _with_unique_columns(df)
+    output = io.BytesIO()
+    df.to_parquet(output, index=False, engine="pyarrow")
+    return output.getvalue()
+
+
+def _dataframe_to_arrow(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(_with_unique_columns(df), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _zip_tables(files: list[tuple[str, bytes]]) -> bytes:
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+    return output.getvalue()
+
+
 @app.get("/")
 def health_check():
     return {"status": "ok", "message": "Tabula Web API is running"}
@@ -301,28 +708,32 @@ async def get_page_image(
     - **page**: 1 始まりのページ番号
     """
     content = await _read_pdf_upload(file)
-    tmp_path = _write_temp_pdf(content)
 
-    try:
-        images = convert_from_path(
-            tmp_path,
-            first_page=page,
-            last_page=page,
-            dpi=150,
-        )
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=f"PDF のページ画像変換に失敗しました: {str(e)}")
-    finally:
-        os.unlink(tmp_path)
+    def render() -> bytes:
+        tmp_path = _write_temp_pdf(content)
+        try:
+            images = convert_from_path(
+                tmp_path,
+                first_page=page,
+                last_page=page,
+                dpi=150,
+            )
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"PDF のページ画像変換に失敗しました: {str(e)}")
+        finally:
+            os.unlink(tmp_path)
 
-    if not images:
-        raise HTTPException(status_code=404, detail=f"ページ {page} が見つかりません")
+        if not images:
+            raise HTTPException(status_code=404, detail=f"ページ {page} が見つかりません")
 
-    img_io = io.BytesIO()
-    images[0].save(img_io, format="PNG")
-    img_io.seek(0)
+        img_io = io.BytesIO()
+        images[0].save(img_io, format="PNG")
+        return img_io.getvalue()
 
-    return Response(content=img_io.read(), media_type="image/png")
+    key = _single_flight_key(content, "page-image", {"page": page})
+    png = await _single_flight(key, render, _identity, _identity)
+
+    return Response(content=png, media_type="image/png")
 
 
 @app.post("/page-count")
@@ -363,7 +774,7 @@ async def extract_table(
       例: '[{"page": 1, "top": 0.1, "left": 0.1, "bottom": 0.5, "right": 0.9}, ...]'
     """
     content = await _read_pdf_upload(file)
-    all_dfs = _extract_dataframes_from_content(content, mode, pages, area, regions)
+    all_dfs = await _extract_dataframes_from_content(content, mode, pages, area, regions)
     tables = _dataframes_to_tables(all_dfs)
 
     return {"tables": tables, "count": len(tables)}
@@ -373,17 +784,21 @@ async def extract_table(
 async def download_table(
     file: UploadFile = File(...),
     table_index: int = Form(0),
-    format: Literal["csv", "excel", "json"] = Form("csv"),
+    format: Literal["csv", "excel", "json", "parquet", "arrow"] = Form("csv"),
     mode: Literal["lattice", "stream"] = Form("lattice"),
     pages: str = Form("all"),
     area: str = Form(""),
     regions: str = Form("[]"),
+    infer_types: bool = Form(False),
 ):
     """
-    指定したテーブルを CSV / Excel / JSON 形式でダウンロードする。
+    指定したテーブルを CSV / Excel / JSON / Parquet / Arrow 形式でダウンロードする。
+
+    - **infer_types**: true の場合、数値（「1,234」「△12」、全角数字、%）と日付（和暦を含む）の列を型変換する
+    - **parquet** / **arrow**: 全テーブル指定（table_index=-1）の場合は ZIP にまとめて返す
     """
     content = await _read_pdf_upload(file)
-    all_dfs = _extract_dataframes_from_content(content, mode, pages, area, regions)
+    all_dfs = await _extract_dataframes_from_content(content, mode, pages, area, regions)
 
     if not all_dfs:
         raise HTTPException(status_code=404, detail="テーブルが見つかりません")
@@ -398,6 +813,9 @@ async def download_table(
         selected_dfs = [_clean_dataframe(all_dfs[table_index])]
         base_name = f"table_{table_index + 1}"
 
+    if infer_types:
+        selected_dfs = [_infer_column_types(df) for df in selected_dfs]
+
     if format == "csv":
         output = io.StringIO()
         for i, df in enumerate(selected_dfs):
@@ -428,7 +846,10 @@ async def download_table(
 
     elif format == "json":
         if len(selected_dfs) == 1:
-            json_str = selected_dfs[0].to_json(orient="records", force_ascii=False)
+            json_str = selected_dfs[0].to_json(orient="records", force_ascii=False, date_format="iso")
+        elif infer_types:
+            payload = [_typed_dataframe_to_table(df, i) for i, df in enumerate(selected_dfs)]
+            json_str = json.dumps(payload, ensure_ascii=False)
         else:
             payload = _dataframes_to_tables(selected_dfs)
             json_str = json.dumps(payload, ensure_ascii=False)
@@ -438,6 +859,27 @@ async def download_table(
             headers={"Content-Disposition": f'attachment; filename="{base_name}.json"'},
         )
 
+    elif format in ("parquet", "arrow"):
+        if format == "parquet":
+            serialize, extension, media_type = _dataframe_to_parquet, "parquet", "application/vnd.apache.parquet"
+        else:
+            serialize, extension, media_type = _dataframe_to_arrow, "arrow", "application/vnd.apache.arrow.file"
+
+        if len(selected_dfs) == 1:
+            data = serialize(selected_dfs[0])
+        else:
+            # Parquet / Arrow は 1 ファイル 1 スキーマのため、複数テーブルは ZIP にまとめる
+            data = _zip_tables([
+                (f"table_{i + 1}.{extension}", serialize(df)) for i, df in enumerate(selected_dfs)
+            ])
+            extension, media_type = "zip", "application/zip"
+
+        return StreamingResponse(
+            iter([data]),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{base_name}.{extension}"'},
+        )
+
 
 @app.post("/detect-tables")
 async def detect_tables(
@@ -449,40 +891,45 @@ async def detect_tables(
     Screen B での自動検出機能に使用。
     """
     content = await _read_pdf_upload(file)
-    tmp_path = _write_temp_pdf(content)
 
-    try:
-        # 1. pypdf でページサイズ（ポイント単位）を取得
-        reader = PdfReader(tmp_path)
-        geometry = _get_page_geometry(reader, page)
-
-        # 2. tabula-py で表領域を検出 (guess=True, output_format="json")
-        # JSON output contain list of tables with absolute coordinates (points)
-        tables = tabula.read_pdf(
-            tmp_path,
-            pages=page,
-            guess=True,
-            multiple_tables=True,
-            output_format="json",
-            lattice=True,  # lattice=True (格子) or stream=True? usually detecting generic tables needs guess=True which handles both? 
-                           # tabula-py documentation says guess=True is default.
-                           # But explicit mode might be needed? 
-                           # Let's trust default guess behavior for detection.
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=f"PDF の解析に失敗しました: {str(e)}")
-    finally:
-        os.unlink(tmp_path)
+    def detect() -> dict:
+        tmp_path = _write_temp_pdf(content)
 
-    # 3. 座標を相対値に変換して返す
-    detected_areas = []
-    if tables:
-        for t in tables:
-            detected_areas.append(_tabula_table_to_region(t, geometry, page))
+        try:
+            # 1. pypdf でページサイズ（ポイント単位）を取得
+            reader = PdfReader(tmp_path)
+            geometry = _get_page_geometry(reader, page)
 
-    return {"areas": detected_areas, "page": page}
+            # 2. tabula-py で表領域を検出 (guess=True, output_format="json")
+            # JSON output contain list of tables with absolute coordinates (points)
+            tables = tabula.read_pdf(
+                tmp_path,
+                pages=page,
+                guess=True,
+                multiple_tables=True,
+                output_format="json",
+                lattice=True,  # lattice=True (格子) or stream=True? usually detecting generic tables needs guess=True which handles both? 
+                               # tabula-py documentation says guess=True is default.
+                               # But explicit mode might be needed? 
+                               # Let's trust default guess behavior for detection.
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"PDF の解析に失敗しました: {str(e)}")
+        finally:
+            os.unlink(tmp_path)
+
+        # 3. 座標を相対値に変換して返す
+        detected_areas = []
+        if tables:
+            for t in tables:
+                detected_areas.append(_tabula_table_to_region(t, geometry, page))
+
+        return {"areas": detected_areas, "page": page}
+
+    key = _single_flight_key(content, "detect-tables", {"page": page})
+    return await _single_flight(key, detect, _dump_json, _load_json)
 
 
 if __name__ == "__main__":